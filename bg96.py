@@ -30,6 +30,8 @@ This module provides the :samp:`bg96Exception` to signal errors related to the h
 
    """
 import gpio
+import timers
+import threading
 
 new_exception(bg96Exception, Exception)
 _reset_pin=None
@@ -38,9 +40,18 @@ _power_pin=None
 _power_on=None
 _status_pin=None
 _status_on=None
+_status_event=threading.Event()
+_status_irq=False
+
+# status pin timeouts in milliseconds
+_STA_ON_TIMEOUT=10000    # from power key pulse to module ready
+_STA_OFF_TIMEOUT=3000    # from power down to module off
+_STA_RESET_TIMEOUT=5500  # from reset pulse to module ready
 
 _gnss_active=False
 _modem_active=False
+# serializes power state transitions requested by the modem and GNSS users
+_power_lock=threading.Lock()
 
 def init(serial,dtr,rts,power,reset,status,power_on=LOW,reset_on=LOW,status_on=HIGH):
     """
@@ -58,8 +69,11 @@ def init(serial,dtr,rts,power,reset,status,power_on=LOW,reset_on=LOW,status_on=H
     * *reset_on*, the active level of the reset pin
     * *status_on*, the value of status pin indicating successful power on (can be zero in some pcb designs)
 
+    The driver attaches rise and fall callbacks (:func:`onPinRise`, :func:`onPinFall`) to the *status* pin, so it should be an MCU pin with a free external interrupt line.
+    If the callbacks cannot be attached, the status pin is polled every 100 milliseconds instead.
+
     """
-    global _reset_pin, _reset_on, _power_pin, _power_on, _status_pin, _status_on
+    global _reset_pin, _reset_on, _power_pin, _power_on, _status_pin, _status_on, _status_irq
     _reset_pin=reset
     _reset_on=reset_on
     _power_pin=power
@@ -68,11 +82,20 @@ def init(serial,dtr,rts,power,reset,status,power_on=LOW,reset_on=LOW,status_on=H
     _status_on=status_on
 
     # print("Setting Pins...");
+    # go through the gpio module: control pins are not necessarily MCU pins
     gpio.mode(_status_pin, INPUT_PULLDOWN if _status_on else INPUT_PULLUP)
     gpio.mode(_reset_pin, OUTPUT_PUSHPULL)
     gpio.set(_reset_pin, HIGH^ _reset_on)
     gpio.mode(_power_pin, OUTPUT_PUSHPULL)
     gpio.set(_power_pin, HIGH^ _power_on)
+    # wake up status waits on every STA transition instead of polling
+    try:
+        onPinRise(_status_pin, _status_cb)
+        onPinFall(_status_pin, _status_cb)
+        _status_irq=True
+    except Exception as e:
+        # no interrupt line for this pin, status waits poll it
+        _status_irq=False
 
     _init(serial,dtr,rts,__nameof(bg96Exception))
     __builtins__.__default_net["gsm"] = __module__
@@ -81,6 +104,25 @@ def init(serial,dtr,rts,power,reset,status,power_on=LOW,reset_on=LOW,status_on=H
 
     shutdown(True)
 
+def _status_cb():
+    _status_event.set()
+
+def _wait_status(active,timeout):
+    # wait until the status pin reports the module as active (or inactive)
+    # return False if the level is not reached within timeout milliseconds
+    deadline = timers.now()+timeout
+    _status_event.clear()
+    while (gpio.get(_status_pin)==_status_on)!=active:
+        left = deadline-timers.now()
+        if left<=0:
+            return False
+        if _status_irq:
+            _status_event.wait(left)
+            _status_event.clear()
+        else:
+            sleep(100)
+    return True
+
 @c_native("_bg96_init",[ 
         "csrc/bg96.c",
         "csrc/bg96_ifc.c",
@@ -118,6 +160,14 @@ def _shutdown(only_modem):
 def _startup(without_modem):
     pass
 
+def _power_pulse(pin,active,t_idle,t_active):
+    # hold pin inactive for t_idle ms, active for t_active ms, then release it
+    gpio.set(pin, HIGH^ active)
+    sleep(t_idle)
+    gpio.set(pin, active)
+    sleep(t_active)
+    gpio.set(pin, HIGH^ active)
+
 @c_native("_bg96_bypass",[])
 def bypass(mode):
     """
@@ -138,8 +188,18 @@ def shutdown(forced=False,_from_gnss=False):
 
     If *forced* is given, use the reset pin (faster, do not detach from network).
     """
+    _power_lock.acquire()
+    try:
+        _do_shutdown(forced,_from_gnss)
+    except Exception as e:
+        _power_lock.release()
+        raise e
+    _power_lock.release()
+
+def _do_shutdown(forced,_from_gnss):
     # keep running for GNSS
     global _gnss_active,_modem_active
+    was_active = (_modem_active,_gnss_active)
     if forced:
         _modem_active = False
         _gnss_active = False
@@ -151,44 +211,22 @@ def shutdown(forced=False,_from_gnss=False):
     if not _modem_active:
         if _shutdown(not _modem_active and _gnss_active):
             # normal shutdown attempted
-            for i in range(30):
-                if gpio.get(_status_pin)!=_status_on:
-                    # print("!STA")
-                    break
-                # print("STA!")
-                sleep(100)
+            _wait_status(False,_STA_OFF_TIMEOUT)
     # full hardware power off if both inactive
     if _modem_active or _gnss_active:
         return
     # print("Powering off...")
     if gpio.get(_status_pin)==_status_on and forced:
-        gpio.set(_reset_pin, HIGH^ _reset_on)
-        sleep(200)
-        gpio.set(_reset_pin, _reset_on)
-        sleep(300)
-        gpio.set(_reset_pin, HIGH^ _reset_on)
-
-        for i in range(55):
-            if gpio.get(_status_pin)==_status_on:
-                # print("f STA!")
-                break
-            # print("f !STA")
-            sleep(100)
-    
+        _power_pulse(_reset_pin,_reset_on,200,300)
+        # wait for the module to come back from reset
+        _wait_status(True,_STA_RESET_TIMEOUT)
+
     if gpio.get(_status_pin)==_status_on:
-        gpio.set(_power_pin, HIGH^ _power_on)
-        sleep(500)
-        gpio.set(_power_pin, _power_on)
-        sleep(700)
-        gpio.set(_power_pin, HIGH^ _power_on)
-
-    for i in range(30):
-        if gpio.get(_status_pin)!=_status_on:
-            # print("!STA")
-            break
-        # print("STA!")
-        sleep(100)
-    else:
+        _power_pulse(_power_pin,_power_on,500,700)
+
+    if not _wait_status(False,_STA_OFF_TIMEOUT):
+        # the module is still powered, do not pretend it is off
+        _modem_active,_gnss_active = was_active
         raise HardwareInitializationError
     sleep(500)
 
@@ -198,21 +236,20 @@ def startup(_from_gnss=False):
 
     Power on the module by pulsing the power pin. 
     """
+    _power_lock.acquire()
+    try:
+        _do_startup(_from_gnss)
+    except Exception as e:
+        _power_lock.release()
+        raise e
+    _power_lock.release()
+
+def _do_startup(_from_gnss):
     # print("Powering on...")
     if gpio.get(_status_pin)!=_status_on:
-        gpio.set(_power_pin, HIGH^ _power_on)
-        sleep(500)
-        gpio.set(_power_pin, _power_on)
-        sleep(600)
-        gpio.set(_power_pin, HIGH^ _power_on)
-
-    for i in range(100):
-        if gpio.get(_status_pin)==_status_on:
-            # print("STA!")
-            break
-        # print("!STA")
-        sleep(100)
-    else:
+        _power_pulse(_power_pin,_power_on,500,600)
+
+    if not _wait_status(True,_STA_ON_TIMEOUT):
         raise HardwareInitializationError
     # turn off modem if only for GNSS
     global _gnss_active,_modem_active
@@ -251,6 +288,9 @@ def operators():
 def set_operator(opname):
     pass
 
+# # bit position of each supported LTE band in the QCFG band mask
+# _LTE_BAND_BIT = {1:0, 2:1, 3:2, 4:3, 5:4, 8:5, 12:6, 13:7, 18:8, 19:9, 20:10, 26:11, 28:12}
+
 # @c_native("_bg96_set_rat",[])
 # def _set_rat(rat,bands):
 #     pass
@@ -262,15 +302,15 @@ def set_operator(opname):
 #     if rat==0:
 #         # gsm bands
 #         for b in bands:
-#             if b in [0,1,2,3]:
+#             if b>=0 and b<4:
 #                 pbands= pbands| (1<<b)
-#         _set_rat(rat,pbands)
 #     else:
 #         # lte bands
-#         for i,b in enumerate(bands):
-#             if b in [1,2,3,4,5,8,12,13,18,19,20,26,28]:
-#                 pbands = pbands | (1<<i)
-#         _set_rat(rat,pbands)
+#         for b in bands:
+#             bit = _LTE_BAND_BIT.get(b)
+#             if bit is not None:
+#                 pbands = pbands | (1<<bit)
+#     _set_rat(rat,pbands)
 
 
 @native_c("py_net_bind",[])
@@ -313,8 +353,8 @@ def sendto(sock,buf,addr,flags=0):
 def send(sock,buf,flags=0):
     pass
 
-def sendall(sock,buf,flags=0):
-    send(sock,buf,flags)
+# the native send already loops until the whole buffer is written
+sendall = send
 
 @native_c("py_net_recv_into",[])
 def recv_into(sock,buf,bufsize,flags=0,ofs=0):
@@ -332,7 +372,69 @@ def secure_socket(family, type, proto, ctx):
 def select(rlist,wist,xlist,timeout):
     pass
 
+@c_native("_bg96_select_mask",[])
+def _select_mask(rlist):
+    pass
+
+@c_native("_bg96_select_wait",[])
+def _select_wait(mask,timeout):
+    pass
+
+# registered socket sets as (mask,sockets), None if the slot is free
+_select_sets=[None,None,None,None]
+
+def select_register(rlist):
+    """
+.. function:: select_register(rlist)
+
+    Register a set of sockets to be repeatedly waited on with :func:`select_wait` and return its handle.
+    The sockets in *rlist* are checked once here instead of at every wait. Up to four sets can be registered at the same time.
+
+    """
+    # raises ValueError for sockets not handled by the driver
+    mask = _select_mask(rlist)
+    for handle in range(len(_select_sets)):
+        if _select_sets[handle] is None:
+            _select_sets[handle] = (mask,rlist)
+            return handle
+    raise RuntimeError
+
+def select_unregister(handle):
+    """
+.. function:: select_unregister(handle)
+
+    Free the socket set registered with *handle*.
+
+    """
+    _select_sets[handle] = None
+
+def select_wait(handle,timeout):
+    """
+.. function:: select_wait(handle,timeout)
+
+    Wait up to *timeout* milliseconds (forever if negative) for data on the sockets registered with *handle*.
+    Return the list of sockets ready for reading, empty on timeout.
+
+    """
+    entry = _select_sets[handle]
+    if entry is None:
+        # not registered or already unregistered
+        raise ValueError
+    mask,socks = entry
+    ready = _select_wait(mask,timeout)
+    res = []
+    for sock in socks:
+        if ready&(1<<sock):
+            res.append(sock)
+    return res
+
 @native_c("_bg96_rtc",[])
+def _rtc(last):
+    pass
+
+_last_rtc=None
+_last_fix=None
+
 def rtc():
     """
 ------------
@@ -357,7 +459,10 @@ The current time can be retrieved with the following function:
     The returned time is always UTC time with a timezone indication.
 
     """
-    pass
+    global _last_rtc
+    # the native returns the previous tuple again if the time has not changed
+    _last_rtc = _rtc(_last_rtc)
+    return _last_rtc
 
 @c_native("_bg96_rssi",[])
 def rssi():
@@ -399,6 +504,9 @@ def gnss_done():
     pass
 
 @c_native("_bg96_gnss_fix",[])
+def _fix(last):
+    pass
+
 def fix():
     """
 .. function:: fix()
@@ -419,7 +527,10 @@ def fix():
     The function return None if a fix can't be obtained.
 
     """
-    pass
+    global _last_fix
+    # the native returns the previous tuple again if the fix has not changed
+    _last_fix = _fix(_last_fix)
+    return _last_fix
 
 @c_native("_bg96_sms_send",[])
 def send_sms(num,txt):
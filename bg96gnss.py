@@ -18,7 +18,7 @@ The driver starts a background thread continuously tracking the last available l
 The frequency of fixes can be customized.
 The driver support serial mode only.
 
-Location fixes are obtained by parsing NMEA sentences of type RMC and GGA.
+Location fixes are obtained by natively parsing NMEA sentences of type RMC, GGA and GSA.
 Obtaining a fix or UTC time are thread safe operations.
 
     """
@@ -28,6 +28,30 @@ import threading
 from quectel.bg96 import bg96
 from quectel.nmea import nmea
 
+@c_native("_bg96_nmea_feed",["csrc/bg96_nmea.c"])
+def _nmea_feed(buf,n):
+    pass
+
+@c_native("_bg96_gnss_read",[])
+def _gnss_read(serial,buf,timeout):
+    pass
+
+@c_native("_bg96_nmea_reset",[])
+def _nmea_reset():
+    pass
+
+@c_native("_bg96_nmea_status",[])
+def _nmea_status():
+    pass
+
+@c_native("_bg96_nmea_fix",[])
+def _nmea_fix(last):
+    pass
+
+@c_native("_bg96_nmea_utc",[])
+def _nmea_utc(last):
+    pass
+
 class BG96_GNSS(nmea.NMEA_Receiver):
     """
 .. class:: BG96_GNSS(ifc, baud=9600)
@@ -56,11 +80,18 @@ class BG96_GNSS(nmea.NMEA_Receiver):
         self.baud = baud
         self.running = False
         self.talking = False
-        self.drv = None
+        # serial port and buffers are kept across stop()/start() cycles
+        self.drv = streams.serial(self.ifc,baud=self.baud,set_default=False)
         self.th = None
         self.fixrate = 1
         self.antpin = antpower
         self.antval = antpower_on
+        # large enough for the bytes received at 9600 baud while the receiver sleeps
+        self._rxbuf = bytearray(512)
+        self._last_fix = None
+        self._last_utc = None
+        # set by the receiver thread when it is ready and when it exits
+        self._thev = threading.Event()
         nmea.NMEA_Receiver.__init__(self)
         if self.antpin is not None:
             pinMode(self.antpin, OUTPUT)
@@ -84,12 +115,15 @@ class BG96_GNSS(nmea.NMEA_Receiver):
         if self.antpin is not None:
             digitalWrite(self.antpin, self.antval) # power on antenna
 
+        _nmea_reset()
         self.enable(True)
         self.running = True
         self.talking = True
+        self._thev.clear()
         self.th = thread(self._run)
+        # start GNSS output only when the receiver is running
+        self._thev.wait(1000)
         bg96.gnss_init(fix_rate=self.fixrate,use_uart = use_uart)
-        sleep(1000)
         return True
 
     def stop(self):
@@ -108,11 +142,13 @@ class BG96_GNSS(nmea.NMEA_Receiver):
         if bg96._gnss_active: # prevent exception if modem was forced off
             bg96.gnss_done()
         self.enable(False)
+        self._thev.clear()
         self.running = False
         self.talking = False
         if self.antpin is not None:
             digitalWrite(self.antpin, HIGH^ self.antval) # power off antenna
-        sleep(1000)
+        # wait for the receiver thread to exit
+        self._thev.wait(1000)
         
         bg96.shutdown(_from_gnss=True)
         return True
@@ -163,6 +199,22 @@ class BG96_GNSS(nmea.NMEA_Receiver):
         if self.talking:
             bg96.gnss_init(fix_rate=self.fixrate,use_uart=1)
 
+    # sentences are decoded natively, fix and utc come from the native parser
+    # which hands back the previous tuple if nothing new has been decoded
+    def fix(self):
+        self._last_fix = _nmea_fix(self._last_fix)
+        return self._last_fix
+
+    def has_fix(self):
+        return (_nmea_status()&1)!=0
+
+    def utc(self):
+        self._last_utc = _nmea_utc(self._last_utc)
+        return self._last_utc
+
+    def has_utc(self):
+        return (_nmea_status()&2)!=0
+
     ##################### Private
 
     def _run(self):
@@ -171,7 +223,7 @@ class BG96_GNSS(nmea.NMEA_Receiver):
 NMEA
 ----
 
-    Additional methods from the base class :any:`nmea.NMEA_Receiver`.
+    Location methods. Sentences of type RMC, GGA and GSA are decoded by a native parser.
 
 .. method:: fix()
 
@@ -205,23 +257,28 @@ NMEA
         Return *True* if a UTC time is available
 
         """
-        buffer = bytearray(256)
-        self.drv = streams.serial(self.ifc,baud=self.baud,set_default=False)
+        rxbuf = self._rxbuf
+        self._thev.set()
 
         while self.running:
             try:
-                chs = nmea.readline(self.ifc,buffer)
+                # drain the NMEA bytes already received with a single read,
+                # sleeping 500 ms when idle (the bound lets stop() be noticed)
+                n = _gnss_read(self.ifc,rxbuf,500)
+                if not n:
+                    continue
+                #-if BG96_GNSS_DEBUG
                 if self.debug:
-                    self.print_d(buffer[:buffer.find(b'\0')])
+                    self.print_d(rxbuf[:n])
+                #-endif
                 if not self.talking:
                     continue
-                if chs>=1:
-                    self.parse(buffer, chs)
-                else:
-                    self.print_d("BG96_GNSS check",chs)
+                # sentences are split and decoded natively,
+                # a partial one is completed by the next read
+                _nmea_feed(rxbuf,n)
             except Exception as e:
                 if self.talking:
                     self.print_d("BG96_GNSS loop", e)
 
-        self.drv.close()
         self.th = None
+        self._thev.set()
@@ -94,6 +94,9 @@ void _gs_init(void)
         gs.talking = 0;
         gs.running = 0;
     }
+#if defined(BG96_DNS_CACHE)
+    _gs_dns_cache_flush();
+#endif
     //TODO: regardless of initialized status, reset all sockets
 }
 
@@ -799,10 +802,14 @@ void _gs_handle_urc(GSCmd* cmd)
             //dns ready!
             _gs_parse_command_arguments(buf, ebuf, "ss", &s0, &p0, &s1, &p1);
             if (s1[0] == '0') {
-                //ok...get ipcount
-                _gs_parse_command_arguments(buf, ebuf, "ssi", &s0, &p0, &s1, &p1, &p2);
+                //ok...get ipcount and the ttl of the record (in seconds)
+                nargs = _gs_parse_command_arguments(buf, ebuf, "ssii", &s0, &p0, &s1, &p1, &p2, &p3);
                 printf("Set dns count %i\n", p2);
                 gs.dns_count = p2;
+#if defined(BG96_DNS_CACHE)
+                if (nargs == 4)
+                    gs.dnsttl = p3;
+#endif
             } else {
                 gs.dns_count--;
                 if (s1[0] == '"') {
@@ -1429,7 +1436,20 @@ int _gs_ssl_cfg(int op, int ctx, int val)
         _gs_send_at(GS_CMD_QSSLCFG, "=\"s\",i,i", "sslversion", 10, ctx, val); //select TLS 1.2 only
         break;
     case 1:
+#if defined(BG96_SSL_CIPHERSUITE)
+        {
+            //select a single ciphersuite, the modem wants it as 0X followed by 4 hex digits
+            uint8_t suite[6];
+            int i;
+            suite[0] = '0';
+            suite[1] = 'X';
+            for (i = 0; i < 4; i++)
+                suite[2 + i] = "0123456789ABCDEF"[((BG96_SSL_CIPHERSUITE) >> (12 - 4 * i)) & 0xf];
+            _gs_send_at(GS_CMD_QSSLCFG, "=\"s\",i,s", "ciphersuite", 11, ctx, suite, 6);
+        }
+#else
         _gs_send_at(GS_CMD_QSSLCFG, "=\"s\",i,0XFFFF", "ciphersuite", 11, ctx); //select all secure ciphersuites
+#endif
         break;
     case 2:
         _gs_send_at(GS_CMD_QSSLCFG, "=\"s\",i,\"s\"", "cacert", 6, ctx, f_cacert, 7); //select cacert
@@ -1637,6 +1657,10 @@ int _gs_socket_connect(int id, struct sockaddr_in *addr){
     }
 
     if (res) {
+#if defined(BG96_DNS_CACHE)
+        //do not keep handing out an address that can't be reached
+        _gs_dns_cache_drop(saddr, saddrlen);
+#endif
         _gs_socket_close(id);
         // vosSemWait(sock->lock);
         // if connection failed, close to allow retrying a new connect on the same sock
@@ -1747,6 +1771,10 @@ void _gs_socket_close_all(void)
             _gs_socket_closing(id);
         }
     }
+#if defined(BG96_DNS_CACHE)
+    //sockets are torn down when the network context is lost: cached addresses may be stale
+    _gs_dns_cache_flush();
+#endif
 }
 
 int _gs_socket_send(int id, uint8_t* buf, int len)
@@ -2212,6 +2240,94 @@ void _gs_socket_pending(int id)
     vosSemSignal(gs.selectlock);
 }
 
+#if defined(BG96_DNS_CACHE)
+//cache of the last resolved hostnames, to skip AT+QIDNSGIP on repeated lookups
+#define DNS_CACHE_SIZE 2
+#define DNS_CACHE_NAME_LEN 64
+
+typedef struct _gs_dns_entry {
+    uint8_t name[DNS_CACHE_NAME_LEN];
+    uint8_t namelen;
+    uint8_t addrlen;
+    uint8_t addr[16];
+    uint32_t stime;
+    uint32_t ttl;
+} GSDnsEntry;
+
+static GSDnsEntry gs_dns_cache[DNS_CACHE_SIZE];
+static uint8_t gs_dns_next;
+
+/**
+ * @brief Look up a hostname in the DNS cache (gs.dnsmode must be held)
+ *
+ * @return the length of the cached address, 0 if not cached or expired
+ */
+int _gs_dns_cache_get(uint8_t* url, int len, uint8_t* addr)
+{
+    int i;
+    uint32_t now = (uint32_t)(vosMillis() / 1000);
+    for (i = 0; i < DNS_CACHE_SIZE; i++) {
+        GSDnsEntry* entry = &gs_dns_cache[i];
+        if (entry->addrlen && entry->namelen == len && memcmp(entry->name, url, len) == 0) {
+            if ((now - entry->stime) >= entry->ttl) {
+                entry->addrlen = 0;
+                return 0;
+            }
+            memcpy(addr, entry->addr, entry->addrlen);
+            return entry->addrlen;
+        }
+    }
+    return 0;
+}
+
+/**
+ * @brief Store a resolved hostname in the DNS cache for ttl seconds (gs.dnsmode must be held)
+ */
+void _gs_dns_cache_put(uint8_t* url, int len, uint8_t* addr, int addrlen, uint32_t ttl)
+{
+    GSDnsEntry* entry;
+    if (!ttl || len > DNS_CACHE_NAME_LEN || addrlen > 16)
+        return;
+    entry = &gs_dns_cache[gs_dns_next];
+    gs_dns_next = (gs_dns_next + 1) % DNS_CACHE_SIZE;
+    entry->addrlen = 0;
+    memcpy(entry->name, url, len);
+    entry->namelen = len;
+    memcpy(entry->addr, addr, addrlen);
+    entry->stime = (uint32_t)(vosMillis() / 1000);
+    entry->ttl = ttl;
+    entry->addrlen = addrlen;
+}
+
+/**
+ * @brief Forget the cached hostnames resolved to addr (e.g. after a failed connect)
+ *
+ * Only clears the length byte of the entries, so it is safe to call without gs.dnsmode
+ */
+void _gs_dns_cache_drop(uint8_t* addr, int addrlen)
+{
+    int i;
+    for (i = 0; i < DNS_CACHE_SIZE; i++) {
+        GSDnsEntry* entry = &gs_dns_cache[i];
+        if (entry->addrlen == addrlen && memcmp(entry->addr, addr, addrlen) == 0)
+            entry->addrlen = 0;
+    }
+}
+
+/**
+ * @brief Forget all cached hostnames (network context changed)
+ *
+ * Only clears the length byte of the entries, so it is safe to call without gs.dnsmode
+ * (e.g. from the modem thread while another thread is resolving)
+ */
+void _gs_dns_cache_flush(void)
+{
+    int i;
+    for (i = 0; i < DNS_CACHE_SIZE; i++)
+        gs_dns_cache[i].addrlen = 0;
+}
+#endif
+
 int _gs_resolve(uint8_t* url, int len, uint8_t* addr)
 {
     int res = 0, cnt;
@@ -2222,6 +2338,15 @@ int _gs_resolve(uint8_t* url, int len, uint8_t* addr)
     }
 
     vosSemWait(gs.dnsmode);
+#if defined(BG96_DNS_CACHE)
+    res = _gs_dns_cache_get(url, len, addr);
+    if (res > 0) {
+        printf("DNS from cache\n");
+        vosSemSignal(gs.dnsmode);
+        return res;
+    }
+    gs.dnsttl = 0;
+#endif
     gs.dns_ready = 0;
     slot = _gs_acquire_slot(GS_CMD_QIDNSGIP, NULL, 0, GS_TIMEOUT * 60, 0);
     _gs_send_at(GS_CMD_QIDNSGIP, "=i,\"s\"", GS_PROFILE, url, len);
@@ -2241,6 +2366,10 @@ int _gs_resolve(uint8_t* url, int len, uint8_t* addr)
         res = gs.dnsaddrlen; //0 in case of error
         printf("copying from %x to %x %i bytes\n", gs.dnsaddr, addr, res);
         memcpy(addr, gs.dnsaddr, res);
+#if defined(BG96_DNS_CACHE)
+        if (res > 0)
+            _gs_dns_cache_put(url, len, addr, res, gs.dnsttl);
+#endif
     } else {
         printf("DNS NOT READY\n");
         res = -1;
@@ -2517,6 +2646,10 @@ int _gs_control_psd(int activate)
     GSSlot* slot;
     int res;
     activate = (activate) ? 1 : 0;
+#if defined(BG96_DNS_CACHE)
+    //attaching or detaching changes the network context
+    _gs_dns_cache_flush();
+#endif
     if (activate) {
         slot = _gs_acquire_slot(GS_CMD_QIACT, NULL, 0, GS_TIMEOUT * 60 * 3, 0);
         _gs_send_at(GS_CMD_QIACT, "=i", GS_PROFILE);
@@ -3018,6 +3151,43 @@ int bg96_gzsock_select(int maxfdp1, void *readset, void *writeset, void *excepts
     return 0;
 }
 
+/**
+ * @brief Wait for data on a fixed set of sockets
+ *
+ * Same as bg96_gzsock_select for reading, but only the sockets whose bit is set in mask are checked.
+ * Returns the mask of readable sockets, 0 on timeout or -1 if one of the sockets does not exist
+ */
+int _gs_select_mask(uint32_t mask, int32_t timeout)
+{
+    uint64_t tstart;
+    uint32_t timepast;
+    uint32_t ready;
+    int32_t sock, r;
+
+    tstart = vosMillis();
+    while(1){
+        ready = 0;
+        for(sock=0;sock<MAX_SOCKS;sock++){
+            if(!(mask&(1<<sock))) continue;
+            r = _gs_socket_available(sock);
+            if (r>0 || r==ERR_CLSD) {
+                ready |= (1<<sock);
+            } else if(r==ERR_CONN) {
+                return -1;
+            }
+        }
+        if (ready) return ready;
+        if (timeout>=0) {
+            timepast = (uint32_t)(vosMillis()-tstart);
+            if(timepast>(uint32_t)timeout) return 0;
+            if(vosSemWaitTimeout(gs.selectlock,TIME_U((timeout-timepast),MILLIS))==VRES_TIMEOUT) return 0;
+        } else {
+            vosSemWait(gs.selectlock);
+        }
+    }
+    return 0;
+}
+
 int bg96_gzsock_read(int sock_id, void *mem, size_t len) {
     return bg96_gzsock_recv(sock_id, mem, len, 0);
 }
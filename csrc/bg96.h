@@ -12,10 +12,17 @@
 #define MAX_CMD 545
 // max out packet len supported by modem
 #define MAX_SOCK_TX_LEN 1460
-// max len of any packet read from modem
+// max len of any packet read from modem (the modem accepts reads up to 1500 bytes)
+#if !defined(BG96_SOCK_RX_BUF)
 #define MAX_SOCK_RX_BUF 256
+#else
+#if BG96_SOCK_RX_BUF > 1500
+#error "BG96_SOCK_RX_BUF can't exceed 1500 bytes, the max read size of the modem"
+#endif
+#define MAX_SOCK_RX_BUF BG96_SOCK_RX_BUF
+#endif
 // request len for buffered reads (<=RX_BUF)
-#define MAX_SOCK_RX_LEN 256
+#define MAX_SOCK_RX_LEN MAX_SOCK_RX_BUF
 #define MAX_OPS 6
 #define MAX_ERR_LEN 32
 #define GS_TIMEOUT 1000
@@ -127,6 +134,7 @@ typedef struct _gsm_status {
     uint8_t dnsaddrlen;
     uint8_t dns_ready;
     uint8_t dns_count;
+    uint32_t dnsttl;
     uint8_t lac[10];
     uint8_t ci[10];
     uint8_t tech;
@@ -357,10 +365,17 @@ int _gs_socket_available(int id);
 int _gs_socket_available_nolock(int id);
 int _gs_socket_close(int id);
 int _gs_resolve(uint8_t* url, int len, uint8_t* addr);
+#if defined(BG96_DNS_CACHE)
+int _gs_dns_cache_get(uint8_t* url, int len, uint8_t* addr);
+void _gs_dns_cache_put(uint8_t* url, int len, uint8_t* addr, int addrlen, uint32_t ttl);
+void _gs_dns_cache_drop(uint8_t* addr, int addrlen);
+void _gs_dns_cache_flush(void);
+#endif
 int _gs_socket_tls(int id, uint8_t* cacert, int cacertlen, uint8_t* clicert, int clicertlen, uint8_t* pvkey, int pvkeylen, int authmode);
 int _gs_socket_bind(int id, struct sockaddr_in *addr);
 int _gs_socket_isalive(int id);
 void _gs_socket_close_all(void);
+int _gs_select_mask(uint32_t mask, int32_t timeout);
 
 int _gs_sms_list(int unread, GSSMS* sms, int maxsms, int offset);
 int _gs_sms_send(uint8_t* num, int numlen, uint8_t* txt, int txtlen);
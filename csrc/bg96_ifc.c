@@ -1048,8 +1048,58 @@ C_NATIVE(_bg96_resolve){
 
 
 
+/**
+ * @brief _bg96_select_mask builds the bitmask of a sequence of sockets for _bg96_select_wait
+ *
+ * Raises ValueError if a socket is not one of the MAX_SOCKS driver sockets
+ */
+C_NATIVE(_bg96_select_mask){
+    C_NATIVE_UNWARN();
+    PObject *rlist;
+    int32_t i, sock;
+    uint32_t mask = 0;
+
+    if (nargs != 1) return ERR_TYPE_EXC;
+    rlist = args[0];
+    if (!IS_OBJ_PSEQUENCE_TYPE(PTYPE(rlist))) return ERR_TYPE_EXC;
+    for (i = 0; i < PSEQUENCE_ELEMENTS(rlist); i++) {
+        PObject *fd = PSEQUENCE_OBJECTS(rlist)[i];
+        if (!IS_PSMALLINT(fd)) return ERR_TYPE_EXC;
+        sock = PSMALLINT_VALUE(fd);
+        if (sock < 0 || sock >= MAX_SOCKS) return ERR_VALUE_EXC;
+        mask |= (1 << sock);
+    }
+    *res = PSMALLINT_NEW(mask);
+    return ERR_OK;
+}
+
+/**
+ * @brief _bg96_select_wait waits for data on the sockets selected by a bitmask
+ *
+ * Returns the bitmask of sockets ready for reading (0 on timeout)
+ */
+C_NATIVE(_bg96_select_wait){
+    C_NATIVE_UNWARN();
+    int32_t mask;
+    int32_t timeout;
+    int32_t ready;
+
+    if (parse_py_args("ii", nargs, args, &mask, &timeout) != 2) return ERR_TYPE_EXC;
+
+    RELEASE_GIL();
+    ready = _gs_select_mask(mask, timeout);
+    ACQUIRE_GIL();
+    if (ready < 0) return ERR_IOERROR_EXC;
+    *res = PSMALLINT_NEW(ready);
+    return ERR_OK;
+}
+
+
 // /////////////////////RTC
 
+// last RTC reading, to return the same tuple while time has not changed
+static uint8_t last_rtc[20];
+
 C_NATIVE(_bg96_rtc){
     C_NATIVE_UNWARN();
     int err = ERR_OK;
@@ -1060,6 +1110,12 @@ C_NATIVE(_bg96_rtc){
     if(!_gs_get_rtc(time)) err=ERR_RUNTIME_EXC;
     ACQUIRE_GIL();
     if (err==ERR_OK) {
+        if (nargs>0 && args[0]!=MAKE_NONE() && memcmp(time,last_rtc,20)==0) {
+            // unchanged, reuse the tuple returned by the previous call
+            *res = args[0];
+            return err;
+        }
+        memcpy(last_rtc,time,20);
         PTuple* tpl = ptuple_new(7,NULL);
         int yy,MM,dd,hh,mm,ss,tz;
         yy = 2000+((time[0]-'0')*10+(time[1]-'0'));
@@ -1255,6 +1311,9 @@ C_NATIVE(_bg96_gnss_done){
     return err;
 }
 
+// last decoded fix, to return the same tuple while the fix has not changed
+static GNSSLoc last_loc;
+
 C_NATIVE(_bg96_gnss_fix){
     C_NATIVE_UNWARN();
     int err = ERR_OK;
@@ -1262,9 +1321,17 @@ C_NATIVE(_bg96_gnss_fix){
     GNSSLoc loc;
     *res = MAKE_NONE();
 
+    memset(&loc,0,sizeof(GNSSLoc));
     RELEASE_GIL();
     r = _gs_gnss_loc(&loc);
+    ACQUIRE_GIL();
     if(r==0) {
+        if (nargs>0 && args[0]!=MAKE_NONE() && memcmp(&loc,&last_loc,sizeof(GNSSLoc))==0) {
+            // same fix as before, reuse the tuple returned by the previous call
+            *res = args[0];
+            return err;
+        }
+        memcpy(&last_loc,&loc,sizeof(GNSSLoc));
         //there is a fix, let's decode
         PTuple *tpl = ptuple_new(10,NULL);
         PTuple *utc = ptuple_new(6,NULL);
@@ -1288,6 +1355,5 @@ C_NATIVE(_bg96_gnss_fix){
         PTUPLE_SET_ITEM(tpl,9,utc);
         *res = tpl;
     }
-    ACQUIRE_GIL();
     return err;
 }
@@ -0,0 +1,421 @@
+/**
+ * @file bg96_nmea.c
+ * @brief Native NMEA parser for the BG96 GNSS serial port
+ *
+ * Decodes RMC, GGA and GSA sentences into a static structure holding the last
+ * location fix. The natives below never release the GIL, so the structure is
+ * only accessed by one thread at a time and needs no further locking.
+ */
+
+#include "zerynth.h"
+
+#if 0
+#define printf(...) vbl_printf_stdout(__VA_ARGS__)
+#else
+#define printf(...)
+#endif
+
+#define NMEA_MAX_FIELDS 20
+
+#define NMEA_HAS_FIX 1
+#define NMEA_HAS_UTC 2
+
+typedef struct _nmea_fix {
+    double lat;
+    double lon;
+    double alt;
+    double speed;
+    double cog;
+    double hdop;
+    double vdop;
+    double pdop;
+    uint32_t us;
+    uint16_t yy;
+    uint8_t MM;
+    uint8_t dd;
+    uint8_t hh;
+    uint8_t mm;
+    uint8_t ss;
+    uint8_t nsat;
+    uint8_t rmc_valid;
+    uint8_t gga_valid;
+    uint8_t has_time;
+    uint8_t has_date;
+    // set on every decoded sentence, cleared when the tuple is rebuilt
+    uint8_t fix_dirty;
+    uint8_t utc_dirty;
+} NMEAFix;
+
+static NMEAFix nmea;
+
+// NMEA sentences are at most 82 characters long
+#define NMEA_MAX_LINE 96
+
+// sentence being received, carried over between reads; -1 while dropping an overlong one
+static uint8_t nmea_line[NMEA_MAX_LINE];
+static int nmea_linelen;
+
+static int _nmea_hex(uint8_t c)
+{
+    if (c >= '0' && c <= '9') return c - '0';
+    if (c >= 'A' && c <= 'F') return c - 'A' + 10;
+    if (c >= 'a' && c <= 'f') return c - 'a' + 10;
+    return -1;
+}
+
+/**
+ * @brief Validate a sentence and its checksum
+ *
+ * Returns the length of the sentence without checksum and line terminators, 0 if invalid
+ */
+static int _nmea_check(uint8_t* buf, int len)
+{
+    int i, hi, lo;
+    uint8_t cs = 0;
+
+    while (len > 0 && (buf[len - 1] == '\r' || buf[len - 1] == '\n' || buf[len - 1] == 0))
+        len--;
+    if (len < 6 || buf[0] != '$' || buf[len - 3] != '*')
+        return 0;
+    hi = _nmea_hex(buf[len - 2]);
+    lo = _nmea_hex(buf[len - 1]);
+    if (hi < 0 || lo < 0)
+        return 0;
+    len -= 3;
+    for (i = 1; i < len; i++)
+        cs ^= buf[i];
+    if (cs != ((hi << 4) | lo))
+        return 0;
+    return len;
+}
+
+static int _nmea_split(uint8_t* buf, int len, uint8_t** fld, int* fln)
+{
+    int i, n = 0, start = 1;
+
+    for (i = 1; i <= len; i++) {
+        if (i == len || buf[i] == ',') {
+            if (n >= NMEA_MAX_FIELDS)
+                break;
+            fld[n] = buf + start;
+            fln[n] = i - start;
+            n++;
+            start = i + 1;
+        }
+    }
+    return n;
+}
+
+static double _nmea_float(uint8_t* s, int len)
+{
+    double v = 0, div = 1;
+    int i = 0, neg = 0, dot = 0;
+
+    if (len > 0 && (s[0] == '-' || s[0] == '+')) {
+        neg = (s[0] == '-');
+        i++;
+    }
+    for (; i < len; i++) {
+        if (s[i] == '.' && !dot) {
+            dot = 1;
+            continue;
+        }
+        if (s[i] < '0' || s[i] > '9')
+            break;
+        v = v * 10 + (s[i] - '0');
+        if (dot)
+            div *= 10;
+    }
+    v /= div;
+    return (neg) ? -v : v;
+}
+
+static int _nmea_int(uint8_t* s, int len)
+{
+    int i, v = 0;
+
+    for (i = 0; i < len && s[i] >= '0' && s[i] <= '9'; i++)
+        v = v * 10 + (s[i] - '0');
+    return v;
+}
+
+static int _nmea_2dig(uint8_t* s)
+{
+    return (s[0] - '0') * 10 + (s[1] - '0');
+}
+
+// convert (d)ddmm.mmmm plus hemisphere to decimal degrees
+static double _nmea_coord(uint8_t* s, int len, uint8_t* h, int hlen)
+{
+    double v = _nmea_float(s, len);
+    int deg = (int)(v / 100);
+
+    v = deg + (v - deg * 100) / 60.0;
+    if (hlen > 0 && (h[0] == 'S' || h[0] == 'W'))
+        v = -v;
+    return v;
+}
+
+static void _nmea_time(uint8_t* s, int len)
+{
+    int i;
+    uint32_t scale = 100000;
+
+    if (len < 6)
+        return;
+    nmea.hh = _nmea_2dig(s);
+    nmea.mm = _nmea_2dig(s + 2);
+    nmea.ss = _nmea_2dig(s + 4);
+    nmea.us = 0;
+    if (len > 7 && s[6] == '.') {
+        for (i = 7; i < len && scale; i++) {
+            nmea.us += (s[i] - '0') * scale;
+            scale /= 10;
+        }
+    }
+    nmea.has_time = 1;
+}
+
+static void _nmea_date(uint8_t* s, int len)
+{
+    if (len < 6)
+        return;
+    nmea.dd = _nmea_2dig(s);
+    nmea.MM = _nmea_2dig(s + 2);
+    nmea.yy = 2000 + _nmea_2dig(s + 4);
+    nmea.has_date = 1;
+}
+
+// $--RMC,time,status,lat,N/S,lon,E/W,speed (knots),cog,date,...
+static void _nmea_rmc(uint8_t** fld, int* fln, int nf)
+{
+    if (nf < 10)
+        return;
+    _nmea_time(fld[1], fln[1]);
+    _nmea_date(fld[9], fln[9]);
+    nmea.rmc_valid = (fln[2] > 0 && fld[2][0] == 'A');
+    if (!nmea.rmc_valid)
+        return;
+    nmea.lat = _nmea_coord(fld[3], fln[3], fld[4], fln[4]);
+    nmea.lon = _nmea_coord(fld[5], fln[5], fld[6], fln[6]);
+    nmea.speed = _nmea_float(fld[7], fln[7]) * 1.852;
+    nmea.cog = _nmea_float(fld[8], fln[8]);
+}
+
+// $--GGA,time,lat,N/S,lon,E/W,quality,nsat,hdop,alt,...
+static void _nmea_gga(uint8_t** fld, int* fln, int nf)
+{
+    if (nf < 10)
+        return;
+    _nmea_time(fld[1], fln[1]);
+    nmea.gga_valid = (_nmea_int(fld[6], fln[6]) > 0);
+    if (!nmea.gga_valid)
+        return;
+    nmea.lat = _nmea_coord(fld[2], fln[2], fld[3], fln[3]);
+    nmea.lon = _nmea_coord(fld[4], fln[4], fld[5], fln[5]);
+    nmea.nsat = _nmea_int(fld[7], fln[7]);
+    nmea.hdop = _nmea_float(fld[8], fln[8]);
+    nmea.alt = _nmea_float(fld[9], fln[9]);
+}
+
+// $--GSA,mode,fixtype,sv1..sv12,pdop,hdop,vdop
+static void _nmea_gsa(uint8_t** fld, int* fln, int nf)
+{
+    if (nf < 18)
+        return;
+    nmea.pdop = _nmea_float(fld[15], fln[15]);
+    nmea.hdop = _nmea_float(fld[16], fln[16]);
+    nmea.vdop = _nmea_float(fld[17], fln[17]);
+}
+
+static PObject* _nmea_utc_tuple(void)
+{
+    PTuple* utc = ptuple_new(7, NULL);
+
+    PTUPLE_SET_ITEM(utc, 0, PSMALLINT_NEW(nmea.yy));
+    PTUPLE_SET_ITEM(utc, 1, PSMALLINT_NEW(nmea.MM));
+    PTUPLE_SET_ITEM(utc, 2, PSMALLINT_NEW(nmea.dd));
+    PTUPLE_SET_ITEM(utc, 3, PSMALLINT_NEW(nmea.hh));
+    PTUPLE_SET_ITEM(utc, 4, PSMALLINT_NEW(nmea.mm));
+    PTUPLE_SET_ITEM(utc, 5, PSMALLINT_NEW(nmea.ss));
+    PTUPLE_SET_ITEM(utc, 6, PSMALLINT_NEW(nmea.us));
+    return (PObject*)utc;
+}
+
+/**
+ * @brief Decode a single NMEA sentence of len bytes
+ *
+ * Returns 1 if the sentence has been recognized, 0 otherwise
+ */
+static int _nmea_decode(uint8_t* buf, int len)
+{
+    int n, nf;
+    uint8_t* fld[NMEA_MAX_FIELDS];
+    int fln[NMEA_MAX_FIELDS];
+
+    n = _nmea_check(buf, len);
+    if (!n) return 0;
+
+    nf = _nmea_split(buf, n, fld, fln);
+    // address field is talker (2 chars) + sentence type (3 chars)
+    if (nf < 1 || fln[0] != 5) return 0;
+
+    if (memcmp(fld[0] + 2, "RMC", 3) == 0)
+        _nmea_rmc(fld, fln, nf);
+    else if (memcmp(fld[0] + 2, "GGA", 3) == 0)
+        _nmea_gga(fld, fln, nf);
+    else if (memcmp(fld[0] + 2, "GSA", 3) == 0)
+        _nmea_gsa(fld, fln, nf);
+    else
+        return 0;
+
+    nmea.fix_dirty = 1;
+    nmea.utc_dirty = 1;
+    return 1;
+}
+
+///////// CNATIVES
+
+/**
+ * @brief _bg96_nmea_feed splits n received bytes into sentences and decodes them
+ *
+ * A sentence left incomplete at the end of buf is kept in a static buffer and completed
+ * by the next call. Returns the number of sentences recognized
+ */
+C_NATIVE(_bg96_nmea_feed){
+    C_NATIVE_UNWARN();
+    uint8_t* buf;
+    uint32_t len;
+    int32_t n;
+    uint32_t i;
+    int found = 0;
+
+    if (parse_py_args("si", nargs, args, &buf, &len, &n) != 2) return ERR_TYPE_EXC;
+
+    if (n >= 0 && (uint32_t)n < len) len = n;
+    for (i = 0; i < len; i++) {
+        if (buf[i] == '\n') {
+            if (nmea_linelen > 0)
+                found += _nmea_decode(nmea_line, nmea_linelen);
+            nmea_linelen = 0;
+        } else if (nmea_linelen >= 0) {
+            if (nmea_linelen < NMEA_MAX_LINE)
+                nmea_line[nmea_linelen++] = buf[i];
+            else
+                nmea_linelen = -1; // too long, drop it up to the next line
+        }
+    }
+    *res = PSMALLINT_NEW(found);
+    return ERR_OK;
+}
+
+/**
+ * @brief _bg96_gnss_read reads the bytes received on the GNSS serial port
+ *
+ * If nothing is pending, sleeps for timeout milliseconds without holding the GIL (the serial
+ * driver keeps buffering meanwhile), then reads all the available bytes at once (up to the
+ * buffer size). The serial driver has no timed wait, so an idle receiver wakes up once per timeout.
+ * Returns the number of bytes read, 0 if nothing has been received
+ */
+C_NATIVE(_bg96_gnss_read){
+    C_NATIVE_UNWARN();
+    int32_t serial;
+    uint8_t* buf;
+    uint32_t len;
+    int32_t timeout;
+    int32_t n;
+
+    if (parse_py_args("isi", nargs, args, &serial, &buf, &len, &timeout) != 3) return ERR_TYPE_EXC;
+
+    serial &= 0xff;
+    RELEASE_GIL();
+    n = vhalSerialAvailable(serial);
+    if (n <= 0 && timeout > 0) {
+        vosThSleep(TIME_U(timeout, MILLIS));
+        n = vhalSerialAvailable(serial);
+    }
+    if (n > 0) {
+        n = MIN((uint32_t)n, len);
+        vhalSerialRead(serial, buf, n);
+    } else {
+        n = 0;
+    }
+    ACQUIRE_GIL();
+    *res = PSMALLINT_NEW(n);
+    return ERR_OK;
+}
+
+/**
+ * @brief _bg96_nmea_reset forgets the last fix, UTC time and partial sentence
+ */
+C_NATIVE(_bg96_nmea_reset){
+    C_NATIVE_UNWARN();
+    memset(&nmea, 0, sizeof(nmea));
+    nmea_linelen = 0;
+    *res = MAKE_NONE();
+    return ERR_OK;
+}
+
+/**
+ * @brief _bg96_nmea_status returns a bitmask telling if a fix (1) and a UTC time (2) are available
+ */
+C_NATIVE(_bg96_nmea_status){
+    C_NATIVE_UNWARN();
+    int32_t status = 0;
+
+    if (nmea.rmc_valid && nmea.gga_valid) status |= NMEA_HAS_FIX;
+    if (nmea.has_time && nmea.has_date) status |= NMEA_HAS_UTC;
+    *res = PSMALLINT_NEW(status);
+    return ERR_OK;
+}
+
+/**
+ * @brief _bg96_nmea_fix returns the last fix as a tuple of 10 elements or None
+ *
+ * If no sentence has been decoded since the previous call, the tuple passed as argument is returned again
+ */
+C_NATIVE(_bg96_nmea_fix){
+    C_NATIVE_UNWARN();
+    PTuple* tpl;
+
+    *res = MAKE_NONE();
+    if (!(nmea.rmc_valid && nmea.gga_valid)) return ERR_OK;
+    if (!nmea.fix_dirty && nargs > 0 && args[0] != MAKE_NONE()) {
+        *res = args[0];
+        return ERR_OK;
+    }
+    nmea.fix_dirty = 0;
+
+    tpl = ptuple_new(10, NULL);
+    PTUPLE_SET_ITEM(tpl, 0, pfloat_new(nmea.lat));
+    PTUPLE_SET_ITEM(tpl, 1, pfloat_new(nmea.lon));
+    PTUPLE_SET_ITEM(tpl, 2, pfloat_new(nmea.alt));
+    PTUPLE_SET_ITEM(tpl, 3, pfloat_new(nmea.speed));
+    PTUPLE_SET_ITEM(tpl, 4, pfloat_new(nmea.cog));
+    PTUPLE_SET_ITEM(tpl, 5, PSMALLINT_NEW(nmea.nsat));
+    PTUPLE_SET_ITEM(tpl, 6, pfloat_new(nmea.hdop));
+    PTUPLE_SET_ITEM(tpl, 7, pfloat_new(nmea.vdop));
+    PTUPLE_SET_ITEM(tpl, 8, pfloat_new(nmea.pdop));
+    PTUPLE_SET_ITEM(tpl, 9, (nmea.has_date) ? _nmea_utc_tuple() : MAKE_NONE());
+    *res = tpl;
+    return ERR_OK;
+}
+
+/**
+ * @brief _bg96_nmea_utc returns the last UTC time as a tuple of 7 elements or None
+ *
+ * If no sentence has been decoded since the previous call, the tuple passed as argument is returned again
+ */
+C_NATIVE(_bg96_nmea_utc){
+    C_NATIVE_UNWARN();
+
+    *res = MAKE_NONE();
+    if (!(nmea.has_time && nmea.has_date)) return ERR_OK;
+    if (!nmea.utc_dirty && nargs > 0 && args[0] != MAKE_NONE()) {
+        *res = args[0];
+        return ERR_OK;
+    }
+    nmea.utc_dirty = 0;
+    *res = _nmea_utc_tuple();
+    return ERR_OK;
+}
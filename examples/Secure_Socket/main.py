@@ -6,11 +6,8 @@
 ################################################################################
 
 import streams
-import json
 # import the gsm interface
 from wireless import gsm
-# import the http module
-import requests
 import ssl
 
 from quectel.bg96 import bg96 as bg96
@@ -18,11 +15,56 @@ from quectel.bg96 import bg96 as bg96
 
 streams.serial()
 
+# serial port, pins and active levels of the modem, passed to bg96.init
+# they must be set according to your setup
+BG96_PINS = (SERIAL2, D42, D42, D42, D42, D34, 0, 1, 1)
+
+# retrieve the CA certificate used to sign the howsmyssl.com certificate
+cacert = __lookup(SSL_CACERT_DST_ROOT_CA_X3)
+
+# create a SSL context to require server certificate verification
+# it is built once and shared by every connection attempt
+ctx = ssl.create_ssl_context(cacert=cacert,options=ssl.CERT_REQUIRED|ssl.SERVER_AUTH)
+# NOTE: the handshake is performed by the modem, which negotiates any ciphersuite it supports.
+#       Against servers with ECDSA certificates, ECDHE-ECDSA suites avoid the slower RSA
+#       operations: define BG96_SSL_CIPHERSUITE (e.g. 0xC02B) in the project configuration to force one
+# NOTE: if the underlying SSL driver does not support certificate validation
+#       uncomment the following line!
+# ctx = None
+
+# NOTE: TLS runs inside the modem and the response is read in chunks as large as
+#       the socket receive buffer: define BG96_SOCK_RX_BUF (e.g. 1024) in the project
+#       configuration to fetch the body with fewer AT commands
+
+# request constants, shared by every attempt
+url = "https://www.howsmyssl.com/a/check"
+user_agent = {"User-Agent": "curl/7.53.1", "Accept": "*/*" }
+
+# each print is a separate write on the serial console:
+# the cipher list is short, build it first and print it in one go
+def print_ciphers(v):
+    print("Supported Ciphers")
+    print("\n".join(v))
+    print("-----")
+
+# keys of the report that need a custom printer
+handlers = {"given_cipher_suites": print_ciphers}
+
+# print the howsmyssl.com report
+# (walking the result inside a function keeps the loop variables local)
+def dump_result(js):
+    # iterate on keys, values are fetched only where they are used
+    for k in js:
+        handler = handlers.get(k)
+        if handler:
+            handler(js[k])
+        else:
+            print(k,"::",js[k])
+
 try:
     print("Initializing UG96...")
     # init the ug96
-    # pins and serial port must be set according to your setup
-    bg96.init(SERIAL2, D42, D42, D42, D42, D34,0,1,1)
+    bg96.init(*BG96_PINS)
     bg96.startup()
 
 
@@ -33,46 +75,47 @@ try:
     # let's try to connect to https://www.howsmyssl.com/a/check to get some info
     # on the SSL/TLS connection
 
-    # retrieve the CA certificate used to sign the howsmyssl.com certificate
-    cacert = __lookup(SSL_CACERT_DST_ROOT_CA_X3)
-
-    # create a SSL context to require server certificate verification
-    ctx = ssl.create_ssl_context(cacert=cacert,options=ssl.CERT_REQUIRED|ssl.SERVER_AUTH)
-    # NOTE: if the underlying SSL driver does not support certificate validation
-    #       uncomment the following line!
-    # ctx = None
-
+    # import the http module only now that the link is up
+    import requests
 
+    # define BG96_DNS_CACHE in the project configuration to let
+    # the retries reuse the address resolved by the first attempt
+    response = None
     for i in range(3):
         try:
             print("Trying to connect...")
-            url="https://www.howsmyssl.com/a/check"
             # url resolution and http protocol handling are hidden inside the requests module
-            user_agent = {"User-Agent": "curl/7.53.1", "Accept": "*/*" }
             # pass the ssl context together with the request
             response = requests.get(url,headers=user_agent,ctx=ctx)
             # if we get here, there has been no exception, exit the loop
             break
         except Exception as e:
+            # DNS, connection and TLS failures can surface as different
+            # exception types from the requests module: retry on any of them
             print(e)
 
 
     try:
         # check status and print the result
-        if response.status==200:
+        if response is None:
+            print("No response")
+        elif response.status!=200:
+            print("Bad status:",response.status)
+            # free socket and body right away, they will never be parsed
+            response.close()
+            response = None
+        else:
             print("Success!!")
             print("-------------")
             # it's time to parse the json response
+            # (json is only needed when the request succeeds)
+            import json
             js = json.loads(response.content)
+            # drop the raw body before walking the parsed data,
+            # so that both are not kept in memory at the same time
+            response = None
             # super easy!
-            for k,v in js.items():
-                if k=="given_cipher_suites":
-                    print("Supported Ciphers")
-                    for cipher in v:
-                        print(cipher)
-                    print("-----")
-                else:
-                    print(k,"::",v)
+            dump_result(js)
             print("-------------")
     except Exception as e:
         print("ooops, something very wrong! :(",e)
@@ -7,25 +7,35 @@
 
 import streams
 import socket
+import select
 # import the gsm interface
 from wireless import gsm
-from quectel.ug96 import ug96 as ug96
+from quectel.bg96 import bg96 as bg96
 
 # For this example to work, you need an UDP server somewhere on the public
 # internet. You can run this example (https://gist.github.com/Manouchehri/67b53ecdc767919dddf3ec4ea8098b20)
 # on your cloud instance on the port you prefer for the sake of this test
+# If the server echoes datagrams back, the example also checks the reply
 
 streams.serial()
 
+# serial port, pins and active levels of the modem, passed to bg96.init
+# they must be set according to your setup
+BG96_PINS = (SERIAL2, D42, D42, D42, D42, D34, 0, 1, 1)
+
 # specify here the IP and port of your UDP server
 server_ip = "0.0.0.0"
 server_port = 7778
 
+# the payload is encoded once and shared by every send:
+# five lines batched in a single datagram, since the cost of each send
+# is dominated by the modem round trip, not by the payload size
+PAYLOAD = b"Hello\n"*5
+
 try:
     print("Initializing UG96...")
     # init the ug96
-    # pins and serial port must be set according to your setup
-    bg96.init(SERIAL2, D42, D42, D42, D42, D34,0,1,1)
+    bg96.init(*BG96_PINS)
     bg96.startup()
 
     # use the wifi interface to link to the Access Point
@@ -42,9 +52,8 @@ try:
     # specified in the connect method
     sock= socket.socket(type=socket.SOCK_DGRAM,proto=socket.IPPROTO_UDP)
     sock.connect((server_ip,server_port))
-    for i in range(5):
-        sock.send("Hello\n")
-        sleep(1000)
+    # send returns once the modem has accepted the data, no need to wait
+    sock.send(PAYLOAD)
 
     sock.close()
 
@@ -58,15 +67,25 @@ try:
     # Note: you won't necessarily see the same origin port on the
     # UDP server since GSM networks are usually behind a NAT
     sock.bind(("0.0.0.0",5678))
-    for i in range(5):
-        sock.sendto("Hello\n",(server_ip,server_port))
-        sleep(1000)
+    sock.sendto(PAYLOAD,(server_ip,server_port))
+
+    # if the server echoes the datagrams back, check the reply with a
+    # single large read instead of one small read per line.
+    # recvfrom waits until a datagram arrives: select first, so that
+    # a server that does not echo only costs a 2 seconds wait
+    rlist,wlist,xlist = select.select([sock],[],[],2000)
+    if rlist:
+        data,addr = sock.recvfrom(1500)
+        print("Got",len(data),"bytes back from",addr)
+    else:
+        print("No reply from the server")
 
 except Exception as e:
     print("oops, exception!",e)
 
+# keep the program alive with a heartbeat every minute
 while True:
     print(".")
-    sleep(1000)
+    sleep(60000)
 
 